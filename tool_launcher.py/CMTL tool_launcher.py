@@ -1,217 +1,629 @@
 #!/usr/bin/env python3
 """  
 tool_launcher.py - CMTL launcher (CLI + simple GUI) 
-Safe output initialization included (ensures output/logs and results.json).       
+Safe output initialization included (ensures output/logs and results.jsonl).       
 This file focuses on robust startup and calling internal tools. 
 """    
 import os 
 import sys     
 import json  
 import subprocess
-import shutil 
+import shutil
+import shlex
 import argparse
 import threading
-from datetime import datetime
+import queue
+import atexit
+import codecs
+import contextlib
+import functools
+import importlib.util
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-# optional tkinter UI
+# optional orjson: much faster (de)serialization for results/config, stdlib json otherwise
 try:
-    import tkinter as tk
-    TK_AVAILABLE = True
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode()
+    _loads = orjson.loads
 except Exception:
-    TK_AVAILABLE = False
+    orjson = None
+
+    def _dumps(obj):
+        return json.dumps(obj, separators=(",", ":"))
+    _loads = json.loads
+
+# optional tkinter UI; only looked up here, imported by _load_tk() when a GUI
+# is actually opened, so --cli/--run-all never load Tk
+TK_AVAILABLE = importlib.util.find_spec("tkinter") is not None
+tk = None
 
-ROOT = os.path.dirname(os.path.abspath(__file__))
-CONFIG_PATH = os.path.join(ROOT, "config.json")
-OUTPUT_DIR = os.path.join(ROOT, "output")
-LOG_DIR = os.path.join(OUTPUT_DIR, "logs")
-RESULTS_PATH = os.path.join(OUTPUT_DIR, "results.json")
-TOOLS_DIR = os.path.join(ROOT, "tools")
+# resolved once at import; everything below derives from these
+ROOT = Path(__file__).resolve().parent
+CONFIG_PATH = ROOT / "config.json"
+OUTPUT_DIR = ROOT / "output"
+LOG_DIR = OUTPUT_DIR / "logs"
+RESULTS_PATH = OUTPUT_DIR / "results.jsonl"
+LEGACY_RESULTS_PATH = OUTPUT_DIR / "results.json"
+TOOLS_DIR = ROOT / "tools"
+
+# results.jsonl is append-only, one JSON object per line. Log records and
+# result lines are handed to a single writer thread through a bounded queue;
+# it keeps one O_APPEND descriptor per file open and issues a single
+# os.write() per file per drained batch, so callers never block on file I/O.
+WRITE_QUEUE_SIZE = 4096
+_WRITE_QUEUE = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+_STOP = object()
+# per-thread list of serialized result lines while inside batched_results()
+_BATCH = threading.local()
 
 # -------------------------
 # Safe initialization helpers
 # -------------------------
 def ensure_output():
-    """Ensure output folders exist and results.json is a JSON list."""
-    os.makedirs(LOG_DIR, exist_ok=True)
+    """Ensure output folders exist and results.jsonl is present."""
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
     # create .gitkeep so empty dirs are tracked if required
     try:
-        open(os.path.join(OUTPUT_DIR, ".gitkeep"), "a").close()
-        open(os.path.join(LOG_DIR, ".gitkeep"), "a").close()
+        for keep in (OUTPUT_DIR / ".gitkeep", LOG_DIR / ".gitkeep"):
+            keep.touch(exist_ok=True)
     except Exception:
         pass
-    # create or sanitize results.json
-    if not os.path.exists(RESULTS_PATH):
-        with open(RESULTS_PATH, "w", encoding="utf-8") as f:
-            json.dump([], f, indent=2)
+    migrate_legacy_results()
+    # create results.jsonl if missing (O_EXCL: create-if-missing in one syscall, no exists() race)
+    try:
+        os.close(os.open(RESULTS_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+    except FileExistsError:
+        pass
+
+def _atomic_write(path, text):
+    """Write text to a sibling temp file, then os.replace() it over path.
+
+    Readers see either the old file or the complete new one, never a
+    truncated half-write.
+    """
+    tmp = path.with_name(f"{path.name}.tmp.{os.getpid()}")
+    try:
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644), "wb") as f:
+            f.write(text.encode("utf-8"))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def migrate_legacy_results():
+    """One-time conversion of an old results.json array into results.jsonl."""
+    if RESULTS_PATH.exists() or not LEGACY_RESULTS_PATH.exists():
         return
-    # if exists, try to load and fix if corrupted or not a list
     try:
-        with open(RESULTS_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(LEGACY_RESULTS_PATH, "r", encoding="utf-8") as f:
+            data = _loads(f.read())
         if not isinstance(data, list):
             raise ValueError("results.json not a list")
     except Exception:
-        # back up corrupted file and recreate empty list
-        try:
-            shutil.copy2(RESULTS_PATH, RESULTS_PATH + ".bak")
-        except Exception:
-            pass
-        with open(RESULTS_PATH, "w", encoding="utf-8") as f:
-            json.dump([], f, indent=2)
+        data = []
+    try:
+        _atomic_write(RESULTS_PATH, "".join(_dumps(e) + "\n" for e in data))
+        # keep the original around, same as a corrupted file would be
+        os.replace(LEGACY_RESULTS_PATH, LEGACY_RESULTS_PATH.with_name(LEGACY_RESULTS_PATH.name + ".bak"))
+    except Exception:
+        pass
+
+# (second, "YYYY-MM-DDTHH:MM:SS"), swapped as one tuple so run_all's worker
+# threads never see a half-updated pair; strftime runs once per second
+_TS_CACHE = [(-1, "")]
 
 def now_ts():
-    return datetime.utcnow().isoformat() + "Z"
+    now = time.time()
+    sec = int(now)
+    cached_sec, stamp = _TS_CACHE[0]
+    if cached_sec != sec:
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        _TS_CACHE[0] = (sec, stamp)
+    return f"{stamp}.{int((now - sec) * 1e6):06d}Z"
 
-def write_log(tool_name, text):
+def _write_all(fd, data):
+    while data:
+        data = data[os.write(fd, data):]
+
+def _writer_loop():
+    fds = {}
+    while True:
+        batch = [_WRITE_QUEUE.get()]
+        # drain whatever else is already queued, then write once per file
+        while True:
+            try:
+                batch.append(_WRITE_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+        stop = False
+        pending = {}
+        for item in batch:
+            if item is _STOP:
+                stop = True
+                continue
+            path, text = item
+            pending.setdefault(path, []).append(text)
+        for path, parts in pending.items():
+            try:
+                fd = fds.get(path)
+                if fd is None:
+                    fd = fds[path] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                _write_all(fd, "".join(parts).encode("utf-8", "ignore"))
+            except Exception:
+                pass
+        for _ in batch:
+            _WRITE_QUEUE.task_done()
+        if stop:
+            for fd in fds.values():
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+            return
+
+def _enqueue_write(path, text):
+    global _WRITER
+    if _WRITER is None:
+        with _WRITER_LOCK:
+            if _WRITER is None:
+                _WRITER = threading.Thread(target=_writer_loop, daemon=True)
+                _WRITER.start()
+    try:
+        _WRITE_QUEUE.put_nowait((path, text))
+    except queue.Full:
+        # back-pressure: block until the writer catches up
+        _WRITE_QUEUE.put((path, text))
+
+def flush_writes():
+    """Block until every queued log record / result line is on disk."""
+    if _WRITER is not None:
+        _WRITE_QUEUE.join()
+
+def _stop_writer():
+    if _WRITER is not None:
+        _WRITE_QUEUE.put(_STOP)
+        _WRITER.join(timeout=5)
+
+atexit.register(_stop_writer)
+
+@functools.lru_cache(maxsize=128)
+def _log_path(tool_name):
     safe = tool_name.lower().replace(" ", "_")
-    path = os.path.join(LOG_DIR, f"{safe}.log")
+    return LOG_DIR / f"{safe}.log"
+
+def write_log(tool_name, text):
+    path = _log_path(tool_name)
+    body = text if isinstance(text, str) else str(text)
+    _enqueue_write(path, f"--- {now_ts()} ---\n{body}\n\n")
+
+def load_results(path=RESULTS_PATH):
+    """Read every entry back from results.jsonl, skipping unparsable lines."""
+    flush_writes()
+    results = []
     try:
-        with open(path, "a", encoding="utf-8", errors="ignore") as f:
-            f.write(f"--- {now_ts()} ---\n")
-            f.write(text if isinstance(text, str) else str(text))
-            f.write("\n\n")
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    results.append(_loads(line))
+                except ValueError:
+                    pass
     except Exception:
         pass
+    return results
 
 def append_result(entry):
+    line = _dumps(entry) + "\n"
+    entries = getattr(_BATCH, "entries", None)
+    if entries is not None:
+        entries.append(line)
+        return
+    _enqueue_write(RESULTS_PATH, line)
+
+@contextlib.contextmanager
+def batched_results(into=None):
+    """Hold this thread's append_result() lines and enqueue them as one write on exit.
+
+    Worker threads pass the outer batch's list as `into` to add to it; only
+    the outermost batch writes. Nested batches simply join the current one.
+    """
+    prev = getattr(_BATCH, "entries", None)
+    entries = into if into is not None else (prev if prev is not None else [])
+    _BATCH.entries = entries
     try:
-        with open(RESULTS_PATH, "r", encoding="utf-8") as f:
-            arr = json.load(f)
-            if not isinstance(arr, list):
-                arr = []
-    except Exception:
-        arr = []
-    arr.append(entry)
-    try:
-        with open(RESULTS_PATH, "w", encoding="utf-8") as f:
-            json.dump(arr, f, indent=2)
-    except Exception:
-        pass
+        yield entries
+    finally:
+        _BATCH.entries = prev
+        if into is None and prev is None and entries:
+            _enqueue_write(RESULTS_PATH, "".join(entries))
+
+@functools.lru_cache(maxsize=256)
+def _which_cached(exe, search_path=None):
+    """shutil.which() memoized per (exe, PATH); paths with a directory are checked directly.
+
+    Misses are cached too; load_config() clears the cache so a reload picks
+    up newly installed tools.
+    """
+    if os.path.dirname(exe):
+        return exe if os.path.isfile(exe) and os.access(exe, os.X_OK) else None
+    return shutil.which(exe, path=search_path)
+
+def resolve_cmd(cmd_list):
+    """Return cmd_list with argv[0] replaced by its absolute path (PATH lookups cached).
 
-def run_subprocess_capture(cmd_list, timeout=None):
+    An absolute executable plus close_fds=False is what lets CPython start the
+    child with posix_spawn() rather than fork()+exec(). Our own files are
+    opened non-inheritable, so not closing fds in the child leaks nothing.
+    Windows has no such fast path; see CLOSE_FDS.
+    """
+    if not cmd_list or os.path.isabs(cmd_list[0]):
+        # nothing to look up; a missing file surfaces as FileNotFoundError from subprocess
+        return cmd_list
+    path = _which_cached(cmd_list[0], os.environ.get("PATH"))
+    if path is None:
+        # leave it for subprocess to report
+        return list(cmd_list)
+    return [path] + list(cmd_list[1:])
+
+# False enables posix_spawn() on POSIX. On Windows it would let every child
+# inherit all inheritable handles, including the stdout pipes of tools that
+# Run All started alongside it, so their readers would not see EOF in time.
+CLOSE_FDS = os.name == "nt"
+
+# how much of a tool's output is kept in memory for results.jsonl
+PREVIEW_CHARS = 1000
+READ_CHUNK = 64 * 1024
+
+def run_subprocess_capture(cmd_list, timeout=None, log_name=None):
+    """Run cmd_list; return (ok, output, returncode).
+
+    stderr is merged into stdout. With log_name, output is streamed to that
+    tool's log as it arrives and only the first PREVIEW_CHARS are kept and
+    returned, so memory stays bounded however chatty the tool is.
+    """
+    log_path = _log_path(log_name) if log_name else None
     try:
-        proc = subprocess.run(cmd_list, capture_output=True, text=True, timeout=timeout)
-        out = (proc.stdout or "") + (("\nERR:\n" + proc.stderr) if proc.stderr else "")
-        ok = proc.returncode == 0
-        return ok, out, proc.returncode
+        proc = subprocess.Popen(resolve_cmd(cmd_list), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, close_fds=CLOSE_FDS)
     except FileNotFoundError:
-        return False, f"Executable not found: {cmd_list[0] if cmd_list else ''}", None
-    except subprocess.TimeoutExpired:
-        return False, "Timed out", None
+        msg = f"Executable not found: {cmd_list[0] if cmd_list else ''}"
+        if log_path:
+            write_log(log_name, msg)
+        return False, msg, None
     except Exception as e:
+        if log_path:
+            write_log(log_name, str(e))
         return False, str(e), None
+    parts = []
+
+    def pump():
+        # runs on its own thread so a grandchild holding the pipe open can't
+        # keep the caller past its timeout
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        kept = 0
+        if log_path:
+            _enqueue_write(log_path, f"--- {now_ts()} ---\n")
+        try:
+            with proc.stdout:
+                for chunk in iter(lambda: proc.stdout.read1(READ_CHUNK), b""):
+                    text = decoder.decode(chunk)
+                    if log_path:
+                        _enqueue_write(log_path, text)
+                        if kept < PREVIEW_CHARS:
+                            parts.append(text[:PREVIEW_CHARS - kept])
+                            kept += len(parts[-1])
+                    else:
+                        parts.append(text)
+        except (OSError, ValueError):
+            pass
+        tail = decoder.decode(b"", final=True)
+        if log_path:
+            _enqueue_write(log_path, tail + "\n\n")
+        else:
+            parts.append(tail)
+
+    reader = threading.Thread(target=pump, daemon=True)
+    reader.start()
+    deadline = time.monotonic() + timeout if timeout else None
+    try:
+        rc = proc.wait(timeout)
+        # like subprocess.run: the output must also reach EOF within the timeout
+        reader.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        if reader.is_alive():
+            raise subprocess.TimeoutExpired(cmd_list, timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        # the reader is left to finish on its own once whoever holds the pipe exits
+        if log_path:
+            write_log(log_name, "Timed out")
+        return False, "Timed out", None
+    return rc == 0, "".join(parts), rc
 
 # -------------------------
 # Internal tool runner (python scripts under tools/)
 # -------------------------
+@functools.lru_cache(maxsize=1)
+def _tool_scripts():
+    """Names of the scripts in tools/, listed once; load_config() refreshes it."""
+    try:
+        with os.scandir(TOOLS_DIR) as it:
+            return frozenset(e.name[:-3] for e in it if e.name.endswith(".py") and e.is_file())
+    except OSError:
+        return frozenset()
+
 def run_internal_tool_script(name, args=None, timeout=120):
-    script = os.path.join(TOOLS_DIR, f"{name}.py")
-    if not os.path.exists(script):
+    script = TOOLS_DIR / f"{name}.py"
+    if args is SKIP:
+        # tool_args() found nothing sensible to aim this tool at
+        msg = f"Skipped: {name} takes a single host, not a network range"
+        write_log(name, msg)
+        append_result({"tool": name, "time": now_ts(), "success": False, "note": "skipped_cidr_target", "output_preview": msg})
+        return False, msg, None
+    if name not in _tool_scripts():
         msg = f"Script not found: {script}"
         write_log(name, msg)
         append_result({"tool": name, "time": now_ts(), "success": False, "note": "script_not_found", "output_preview": msg})
         return False, msg, None
-    cmd = [sys.executable, script] + (args if args else [])
-    ok, out, rc = run_subprocess_capture(cmd, timeout=timeout)
-    write_log(name, out)
-    append_result({"tool": name, "time": now_ts(), "success": ok, "exit_code": rc, "cmd": " ".join(cmd), "output_preview": (out[:1000] if out else "")})
+    cmd = [sys.executable, str(script)] + (args if args else [])
+    ok, out, rc = run_subprocess_capture(cmd, timeout=timeout, log_name=name)
+    append_result({"tool": name, "time": now_ts(), "success": ok, "exit_code": rc, "cmd": cmd, "output_preview": out})
     return ok, out, rc
 
 # -------------------------
-# Orchestrator: run all internal tools then external (if any)
+# Orchestrator: run all internal + external tools concurrently
 # -------------------------
+# tool_args() result for a tool that has nothing sensible to aim at
+SKIP = object()
+# internal tools that take the target host as their only argument
+TARGET_ARG_TOOLS = frozenset(("port_scanner", "banner_grabber", "subdomain_finder"))
+
+@functools.lru_cache(maxsize=64)
+def sweep_base(target):
+    """'192.168.1.7' -> '192.168.1.' (the /24 that ping_sweeper walks)."""
+    return ".".join(str(target).split(".")[:3]) + "."
+
+def tool_args(t, target, cfg=None):
+    """Command-line arguments for internal tool t aimed at target (SKIP: don't run it)."""
+    if t == "packet_sniffer":
+        # the capture filter is compiled to BPF and applied in the kernel
+        cfg = cfg or {}
+        args = [str(cfg.get("sniffer_count", 10)), cfg.get("sniffer_filter", "ip")]
+        # empty means the sniffer picks the default-route interface itself
+        if cfg.get("sniffer_iface"):
+            args.append(str(cfg["sniffer_iface"]))
+        return args
+    if not target:
+        return []
+    if t in TARGET_ARG_TOOLS:
+        # a CIDR is only meaningful to ping_sweeper; scanning its network
+        # address (or resolving "10.0.0.0/24" as a domain) would be noise
+        if "/" in str(target):
+            return SKIP
+        return [str(target)]
+    if t == "ping_sweeper":
+        # a CIDR target is swept whole; a host sweeps .1-.50 of its /24
+        if "/" in str(target):
+            return [str(target)]
+        return [sweep_base(target), "1", "50"]
+    return []
+
+def _run_internal_job(t, target, timeout, cfg):
+    ok, out, rc = run_internal_tool_script(t, args=tool_args(t, target, cfg), timeout=timeout)
+    return {"tool": t, "ok": ok, "exit_code": rc}
+
+def _run_external_job(friendly, cmd_def, target, timeout):
+    # load_config() has normally compiled this already; plain lists pass straight through
+    cmd_list = cmd_def if isinstance(cmd_def, list) else compile_command(cmd_def)
+    if not cmd_list:
+        write_log(friendly, "Invalid external tool definition")
+        append_result({"tool": friendly, "time": now_ts(), "success": False, "note": "invalid_definition"})
+        return {"tool": friendly, "ok": False, "exit_code": None}
+    # if command contains "{target}", replace placeholder; a shell command
+    # line gets it quoted so the target can't inject extra shell syntax
+    arg = str(target)
+    if cmd_list[:len(SHELL_ARGV)] == SHELL_ARGV:
+        if os.name != "nt":
+            arg = shlex.quote(arg)
+        elif any("{target}" in x for x in cmd_list) and CMD_META.intersection(arg):
+            # cmd.exe has no quoting that neutralises these, so don't substitute at all
+            msg = f"Refusing target {arg!r}: cmd.exe metacharacters in a shell command"
+            write_log(friendly, msg)
+            append_result({"tool": friendly, "time": now_ts(), "success": False, "note": "unsafe_target", "output_preview": msg})
+            return {"tool": friendly, "ok": False, "exit_code": None}
+        else:
+            arg = subprocess.list2cmdline([arg])
+    cmd_list = [x.replace("{target}", arg) for x in cmd_list]
+    ok, out, rc = run_subprocess_capture(cmd_list, timeout=timeout, log_name=friendly)
+    append_result({"tool": friendly, "time": now_ts(), "success": ok, "exit_code": rc, "cmd": cmd_list, "output_preview": out})
+    return {"tool": friendly, "ok": ok, "exit_code": rc}
+
 def run_all(cfg, target_override=None):
-    summary = []
-    internal = cfg.get("internal_tools", [])
     target = target_override or cfg.get("default_target")
-    for t in internal:
-        args = []
-        if t in ("port_scanner", "banner_grabber", "subdomain_finder"):
-            if target:
-                args = [str(target)]
-        if t == "ping_sweeper" and target:
-            base = ".".join(str(target).split(".")[:3]) + "."
-            args = [base, "1", "50"]
-        ok, out, rc = run_internal_tool_script(t, args=args, timeout=cfg.get("timeout_seconds", 120))
-        summary.append({"tool": t, "ok": ok, "exit_code": rc})
+    jobs = []
+    for t in cfg.get("internal_tools", []):
+        jobs.append((_run_internal_job, t, target, cfg.get("timeout_seconds", 120), cfg))
     # handle external tools if present (best-effort)
     for friendly, cmd_def in cfg.get("external_tools", {}).items():
-        if isinstance(cmd_def, str):
-            cmd_list = cmd_def.split()
-        elif isinstance(cmd_def, (list, tuple)):
-            cmd_list = list(cmd_def)
+        jobs.append((_run_external_job, friendly, cmd_def, target, cfg.get("timeout_seconds", 300)))
+    # every result line of the run, summary included, goes out in one write
+    with batched_results() as batch:
+        def call(job):
+            with batched_results(batch):
+                return job[0](*job[1:])
+        if not jobs:
+            summary = []
         else:
-            write_log(friendly, "Invalid external tool definition")
-            append_result({"tool": friendly, "time": now_ts(), "success": False, "note": "invalid_definition"})
-            summary.append({"tool": friendly, "ok": False, "exit_code": None})
-            continue
-        # if command contains "{target}", replace placeholder
-        cmd_list = [str(x).replace("{target}", str(target)) for x in cmd_list]
-        ok, out, rc = run_subprocess_capture(cmd_list, timeout=cfg.get("timeout_seconds", 300))
-        write_log(friendly, out if out else f"Executed: {' '.join(cmd_list)}")
-        append_result({"tool": friendly, "time": now_ts(), "success": ok, "exit_code": rc, "cmd": " ".join(cmd_list), "output_preview": (out[:1000] if out else "")})
-        summary.append({"tool": friendly, "ok": ok, "exit_code": rc})
-    append_result({"tool": "run_all", "time": now_ts(), "summary": summary})
+            # every tool is its own subprocess, so threads just wait on them side by side;
+            # log writes are already serialized by the writer thread
+            # "parallelism": 1 runs the tools one after another
+            try:
+                workers = max(1, int(cfg.get("parallelism", DEFAULT_CONFIG["parallelism"])))
+            except (TypeError, ValueError):
+                workers = DEFAULT_CONFIG["parallelism"]
+            workers = min(len(jobs), workers)
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                summary = list(ex.map(call, jobs))
+        append_result({"tool": "run_all", "time": now_ts(), "summary": summary})
     return summary
 
 # -------------------------
 # Config loader
 # -------------------------
+DEFAULT_CONFIG = {
+    "project_name": "CMTL",
+    "default_target": "192.168.1.1",
+    "timeout_seconds": 300,
+    "parallelism": 4,
+    "internal_tools": ["port_scanner", "ping_sweeper", "banner_grabber", "packet_sniffer", "subdomain_finder"],
+    "sniffer_count": 10,
+    "sniffer_filter": "ip",
+    "sniffer_iface": "",
+    "external_tools": {}
+}
+# path -> ((mtime_ns, size), config); a reload of an unchanged file is one
+# stat(). A file that fails to parse is cached too (as the empty fallback), so
+# a broken config isn't re-parsed on every reload until it is edited.
+_CFG_CACHE = {}
+
+# what a {"shell": true, "cmd": "..."} external tool runs under
+SHELL_ARGV = ["cmd", "/c"] if os.name == "nt" else ["/bin/sh", "-c"]
+# characters cmd.exe acts on even inside "..." (or that end the command line)
+CMD_META = frozenset('&|<>^%"!\r\n')
+
+def compile_command(cmd_def):
+    """External tool definition -> argv list (None if invalid), done once per config load.
+
+    Strings are split shell-style but run without a shell; only an explicit
+    {"shell": true, "cmd": "..."} object goes through one, for pipes/globs.
+    """
+    if isinstance(cmd_def, str):
+        try:
+            return shlex.split(cmd_def, posix=os.name != "nt")
+        except ValueError:
+            # unbalanced quotes: reported as invalid_definition when run
+            return None
+    if isinstance(cmd_def, (list, tuple)):
+        return [str(x) for x in cmd_def]
+    if isinstance(cmd_def, dict) and isinstance(cmd_def.get("cmd"), str):
+        if cmd_def.get("shell"):
+            return SHELL_ARGV + [cmd_def["cmd"]]
+        return compile_command(cmd_def["cmd"])
+    return None
+
+def merge_config(user_cfg):
+    """Defaults overlaid with the user's keys; external_tools is merged one level down
+    and compiled to argv lists."""
+    tools = {**DEFAULT_CONFIG["external_tools"], **user_cfg.get("external_tools", {})}
+    return {**DEFAULT_CONFIG, **user_cfg,
+            "external_tools": {name: compile_command(cmd_def) for name, cmd_def in tools.items()}}
+
+def _broken_config():
+    return {**DEFAULT_CONFIG, "internal_tools": [], "external_tools": {}}
+
 def load_config(path=CONFIG_PATH):
-    if not os.path.exists(path):
+    _which_cached.cache_clear()
+    _tool_scripts.cache_clear()
+    path = Path(path)
+    try:
+        st = path.stat()
+        key = (st.st_mtime_ns, st.st_size)
+        cached = _CFG_CACHE.get(path)
+        if cached is not None and cached[0] == key:
+            return dict(cached[1])
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cfg = merge_config(_loads(f.read()))
+        except (ValueError, TypeError, AttributeError):
+            cfg = _broken_config()
+        _CFG_CACHE[path] = (key, cfg)
+        return dict(cfg)
+    except FileNotFoundError:
         # minimal default
-        default = {
-            "project_name": "CMTL",
-            "default_target": "192.168.1.1",
-            "timeout_seconds": 300,
-            "internal_tools": ["port_scanner", "ping_sweeper", "banner_grabber", "packet_sniffer", "subdomain_finder"],
-            "external_tools": {}
-        }
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(default, f, indent=2)
+            _atomic_write(path, json.dumps(DEFAULT_CONFIG, indent=2))
         except Exception:
             pass
-        return default
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return merge_config({})
     except Exception:
-        return {"project_name": "CMTL", "default_target": "192.168.1.1", "timeout_seconds": 300, "internal_tools": [], "external_tools": {}}
+        return _broken_config()
 
 # -------------------------
 # CLI menu (simple)
 # -------------------------
+CLI_MENU = "\nCMTL CLI - Options:\n1) Run single internal tool\n2) Run all (internal + external)\n3) Show tools\n0) Exit"
+
+def _cli_run_one(cfg):
+    print("Internal tools:", cfg.get("internal_tools", []))
+    t = input("Tool name: ").strip()
+    if t:
+        run_internal_tool_script(t, args=tool_args(t, cfg.get("default_target"), cfg))
+
+def _cli_run_all(cfg):
+    target = input(f"Target (default {cfg.get('default_target')}): ").strip() or cfg.get("default_target")
+    print("Running all...")
+    print(run_all(cfg, target_override=target))
+
+def _cli_show(cfg):
+    print("Internal:", cfg.get("internal_tools", []))
+    print("External:", list(cfg.get("external_tools", {}).keys()))
+
+def _cli_unknown(cfg):
+    print("Unknown choice.")
+
+CLI_HANDLERS = {"1": _cli_run_one, "2": _cli_run_all, "3": _cli_show}
+
 def cli_menu(cfg):
     while True:
-        print("\nCMTL CLI - Options:")
-        print("1) Run single internal tool")
-        print("2) Run all (internal + external)")
-        print("3) Show tools")
-        print("0) Exit")
+        print(CLI_MENU)
         choice = input("Choose: ").strip()
         if choice == "0":
             break
-        if choice == "1":
-            print("Internal tools:", cfg.get("internal_tools", []))
-            t = input("Tool name: ").strip()
-            if t:
-                run_internal_tool_script(t, args=[cfg.get("default_target")])
-        elif choice == "2":
-            target = input(f"Target (default {cfg.get('default_target')}): ").strip() or cfg.get("default_target")
-            print("Running all...")
-            print(run_all(cfg, target_override=target))
-        elif choice == "3":
-            print("Internal:", cfg.get("internal_tools", []))
-            print("External:", list(cfg.get("external_tools", {}).keys()))
-        else:
-            print("Unknown choice.")
+        CLI_HANDLERS.get(choice, _cli_unknown)(cfg)
 
 # -------------------------
 # Minimal GUI launcher (if tkinter available)
 # -------------------------
+# button clicks are handed to a few long-lived daemon workers instead of a new
+# thread per click; daemon so closing the window doesn't wait on running tools
+GUI_WORKERS = 8
+_GUI_JOBS = queue.Queue()
+_GUI_WORKERS = []
+
+def _gui_worker():
+    while True:
+        fn, args = _GUI_JOBS.get()
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"GUI job failed: {e}")
+
+def gui_submit(fn, *args):
+    if not _GUI_WORKERS:
+        for _ in range(GUI_WORKERS):
+            w = threading.Thread(target=_gui_worker, daemon=True)
+            w.start()
+            _GUI_WORKERS.append(w)
+    _GUI_JOBS.put((fn, args))
+
+def _load_tk():
+    global tk
+    if tk is None and TK_AVAILABLE:
+        try:
+            import tkinter as tk
+        except Exception:
+            pass
+    return tk is not None
+
 def start_gui(cfg):
-    if not TK_AVAILABLE:
+    if not _load_tk():
         print("Tkinter not installed; use --cli or --run-all")
         return
     root = tk.Tk()
@@ -223,15 +635,16 @@ def start_gui(cfg):
 
     tk.Label(frame, text="Internal Tools:", font=("Arial", 12, "bold")).grid(row=0, column=0, sticky="w")
     r = 1
+    target = cfg.get("default_target")
     for t in cfg.get("internal_tools", []):
-        def mk(tool=t):
-            return lambda: threading.Thread(target=run_internal_tool_script, args=(tool, [cfg.get("default_target")]), daemon=True).start()
-        b = tk.Button(frame, text=tool, width=30, command=mk())
+        # arguments worked out once per button, not on every click
+        cmd = functools.partial(gui_submit, run_internal_tool_script, t, tool_args(t, target, cfg))
+        b = tk.Button(frame, text=t, width=30, command=cmd)
         b.grid(row=r, column=0, pady=4, sticky="w")
         r += 1
 
-    tk.Button(root, text="Run All (sequential)", command=lambda: threading.Thread(target=run_all, args=(cfg,), daemon=True).start()).pack(pady=6)
-    tk.Button(root, text="Open output folder", command=lambda: open_output()).pack(pady=2)
+    tk.Button(root, text="Run All", command=functools.partial(gui_submit, run_all, cfg)).pack(pady=6)
+    tk.Button(root, text="Open output folder", command=open_output).pack(pady=2)
     root.mainloop()
 
 def open_output():
@@ -239,9 +652,9 @@ def open_output():
         if os.name == "nt":
             os.startfile(OUTPUT_DIR)
         elif sys.platform == "darwin":
-            subprocess.Popen(["open", OUTPUT_DIR])
+            subprocess.Popen(resolve_cmd(["open", str(OUTPUT_DIR)]), close_fds=False)
         else:
-            subprocess.Popen(["xdg-open", OUTPUT_DIR])
+            subprocess.Popen(resolve_cmd(["xdg-open", str(OUTPUT_DIR)]), close_fds=False)
     except Exception as e:
         print("Failed to open output folder:", e)
 
@@ -271,7 +684,7 @@ def main():
         return
 
     # default: GUI if available else CLI
-    if TK_AVAILABLE:
+    if _load_tk():
         start_gui(cfg)
     else:
         cli_menu(cfg)
@@ -2,19 +2,40 @@
 """
 packet_sniffer.py - Scapy-based packet sniffer with permission checks and helpful messages.
 Usage:
-    sudo python packet_sniffer.py 10
+    sudo python packet_sniffer.py [count] [bpf-filter] [interface]
+    sudo python packet_sniffer.py 10 "tcp port 80"
+    sudo python packet_sniffer.py 10 "tcp port 80" eth0
+    sudo python packet_sniffer.py 10 arp
 Notes:
+ - The BPF filter (default "ip") is compiled into the kernel, so unwanted
+   frames are dropped before they reach Python.
+ - With pcapy-ng + dpkt installed (pip install pcapy-ng dpkt) Ethernet
+   captures skip scapy: dpkt decodes only the IP header, which is far cheaper
+   than scapy's full dissection. scapy is used otherwise.
+ - Without an interface argument the default-route interface is used.
  - Requires scapy package installed (pip install scapy).
  - Requires libpcap / WinPcap / Npcap on the OS and usually root/admin privileges.
 """
 import sys
 import os
+import time
+import socket
+import importlib.util
 
+# scapy.all takes a second or more to import, so it is only loaded when the
+# scapy path actually runs (not when pcapy handles the capture)
+SCAPY_OK = importlib.util.find_spec("scapy") is not None
+
+# optional fast path: libpcap bindings + a minimal decoder
 try:
-    from scapy.all import sniff
-    SCAPY_OK = True
+    import pcapy
+    import dpkt
 except Exception:
-    SCAPY_OK = False
+    pcapy = None
+    dpkt = None
+
+DEFAULT_FILTER = "ip"
+CAPTURE_TIMEOUT = 30
 
 def have_root_privileges():
     if os.name == "nt":
@@ -27,8 +48,91 @@ def have_root_privileges():
     else:
         return os.geteuid() == 0
 
+def default_iface(devs):
+    """Interface carrying the default route, else the first non-loopback one."""
+    try:
+        with open("/proc/net/route") as f:
+            for line in f.readlines()[1:]:
+                fields = line.split()
+                if len(fields) > 1 and fields[1] == "00000000" and fields[0] in devs:
+                    return fields[0]
+    except OSError:
+        pass
+    for d in devs:
+        if d != "any" and not d.startswith("lo") and "loopback" not in d.lower():
+            return d
+    return devs[0] if devs else None
+
+def sniff_fast(count, bpf, timeout=CAPTURE_TIMEOUT, iface=None):
+    """Capture with pcapy + dpkt; None when unavailable or the link isn't Ethernet."""
+    if pcapy is None:
+        return None
+    try:
+        iface = iface or default_iface(pcapy.findalldevs())
+        if not iface:
+            return None
+        cap = pcapy.open_live(iface, 65535, True, 100)
+        if cap.datalink() != pcapy.DLT_EN10MB:
+            return None
+        cap.setfilter(bpf)
+    except Exception:
+        return None
+    seen = [None] * count
+    n = 0
+    deadline = time.monotonic() + timeout
+    while n < count and time.monotonic() < deadline:
+        try:
+            hdr, data = cap.next()
+        except pcapy.PcapError:
+            # a persistent error (interface went down, ...): retrying would just
+            # spin; keep what we have, or let scapy try if nothing came in
+            if n == 0:
+                return None
+            break
+        if hdr is None or not data:
+            continue
+        try:
+            eth = dpkt.ethernet.Ethernet(data)
+        except (dpkt.UnpackError, ValueError):
+            # truncated or malformed frame
+            continue
+        ip = eth.data
+        if isinstance(ip, dpkt.ip.IP):
+            src, dst = socket.inet_ntoa(ip.src), socket.inet_ntoa(ip.dst)
+        elif isinstance(ip, dpkt.ip6.IP6):
+            src, dst = socket.inet_ntop(socket.AF_INET6, ip.src), socket.inet_ntop(socket.AF_INET6, ip.dst)
+        else:
+            # arp etc.: no addresses worth decoding, just say what it was
+            src, dst = f"ethertype 0x{eth.type:04x}", None
+        sec, usec = hdr.getts()
+        seen[n] = (sec + usec / 1e6, src, dst)
+        n += 1
+    return seen[:n]
+
+def sniff_scapy(count, bpf, timeout=CAPTURE_TIMEOUT, iface=None):
+    from scapy.all import sniff, IP, IPv6
+    # sized once for the whole capture; filled by index, trimmed afterwards
+    seen = [None] * count
+    n = [0]
+
+    def on_packet(p):
+        # keep only the fields we print; store=False lets scapy drop the packet
+        if n[0] >= count:
+            return
+        if IP in p:
+            seen[n[0]] = (p.time, p[IP].src, p[IP].dst)
+        elif IPv6 in p:
+            seen[n[0]] = (p.time, p[IPv6].src, p[IPv6].dst)
+        else:
+            seen[n[0]] = (p.time, p.summary(), None)
+        n[0] += 1
+
+    # iface=None leaves scapy on conf.iface, its default-route interface
+    sniff(count=count, timeout=timeout, filter=bpf, iface=iface, store=False, prn=on_packet)
+    return seen[:n[0]]
+
 def main():
-    if not SCAPY_OK:
+    if not SCAPY_OK and pcapy is None:
         print("scapy not installed. Install via: pip install scapy")
         sys.exit(1)
     if not have_root_privileges():
@@ -36,18 +140,25 @@ def main():
         print("On Linux: run with sudo. On Windows: run PowerShell as Administrator and ensure Npcap is installed.")
         # we continue but sniff may fail
     try:
-        count = int(sys.argv[1]) if len(sys.argv) >= 2 else 10
+        count = max(1, int(sys.argv[1])) if len(sys.argv) >= 2 else 10
     except Exception:
         count = 10
+    bpf = sys.argv[2] if len(sys.argv) >= 3 else DEFAULT_FILTER
+    iface = sys.argv[3] if len(sys.argv) >= 4 and sys.argv[3] else None
     try:
-        print(f"Capturing {count} packets (timeout 30s)...")
-        pkts = sniff(count=count, timeout=30)
-        if not pkts:
+        print(f"Capturing {count} packets matching '{bpf}' (timeout {CAPTURE_TIMEOUT}s)...")
+        seen = sniff_fast(count, bpf, iface=iface)
+        if seen is None:
+            if not SCAPY_OK:
+                print("pcapy capture unavailable and scapy not installed. Install via: pip install scapy")
+                sys.exit(1)
+            seen = sniff_scapy(count, bpf, iface=iface)
+        if not seen:
             print("No packets captured (timeout or interface issue).")
             return
-        summaries = [p.summary() for p in pkts]
-        for s in summaries:
-            print(s)
+        sys.stdout.write("".join(
+            f"{float(t):.6f} {src} -> {dst}\n" if dst is not None else f"{float(t):.6f} {src}\n"
+            for t, src, dst in seen))
     except PermissionError:
         print("Permission denied. Run as root/Administrator and ensure libpcap / Npcap is installed.")
     except Exception as e:
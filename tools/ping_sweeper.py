@@ -1,51 +1,245 @@
 #!/usr/bin/env python3
 """
-ping_sweeper.py - cross-platform ping sweep with robust flags
+ping_sweeper.py - ICMP ping sweep over a single socket
 Usage:
     python tools/ping_sweeper.py 192.168.1. 1 50
-If run on Windows the script will use 'ping -n', on Unix it uses 'ping -c'.
+    python tools/ping_sweeper.py 10.0.0.0/28
+One ICMP echo is sent to every host from the same socket, reaping replies
+as they queue up so a big range can't overflow the receive buffer, then the
+stragglers are collected with select() until the timeout. At most 65536 hosts
+(the 16-bit ICMP sequence space) are swept per run. The socket is SOCK_DGRAM
+(unprivileged on Linux when net.ipv4.ping_group_range allows it) or SOCK_RAW
+(root/Administrator). When neither can be opened, a single `fping` run
+covers every host if fping is installed; otherwise the system `ping` is
+launched for all hosts at once and reaped afterwards. Without either binary,
+hosts are probed with an asyncio TCP connect to port 80 (a refused
+connection still means UP).
 """
+import os
 import sys
+import time
+import socket
+import select
+import shutil
+import struct
 import subprocess
-import platform
+import asyncio
+import itertools
+import ipaddress
 
-def is_reachable(ip):
-    system = platform.system().lower()
-    if system == "windows":
-        # -n 1 = 1 echo, -w 1000 = timeout in ms
-        cmd = ["ping", "-n", "1", "-w", "1000", ip]
-    else:
-        # Linux/macOS: -c 1 (1 packet), -W 1 (timeout seconds) on many systems
-        # On some BSD/macOS `-W` uses milliseconds; we choose -c with short overall timeout using timeout command if available.
-        cmd = ["ping", "-c", "1", "-W", "1", ip]
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+PAYLOAD = b"CMTL-ping-sweeper"
+# -n/-c 1 = one echo; -w 1000 ms (Windows) / -W 1 s timeout
+PING_CMD = ["ping", "-n", "1", "-w", "1000"] if os.name == "nt" else ["ping", "-c", "1", "-W", "1"]
+PING_BATCH = 128
+# ping's exit status for "sent, but no reply"; anything else non-zero is an error
+PING_NO_REPLY = 2 if sys.platform == "darwin" else 1
+# close_fds=False is only wanted for posix_spawn(); see ping_process_sweep()
+CLOSE_FDS = os.name == "nt"
+# one echo per host, told apart by its 16-bit sequence number
+MAX_HOSTS = 0x10000
+# queued replies are reaped after this many sends; loopback replies arrive
+# as fast as we send, and a raw socket also sees its own requests
+REAP_EVERY = 32
+RCVBUF = 1 << 20
+
+# ones'-complement sum of the constant part of every echo (type/code word +
+# payload), computed once at import; per host only ident and seq are added
+_PAYLOAD_PAD = PAYLOAD + b"\x00" * (len(PAYLOAD) % 2)
+_CONST_SUM = (ICMP_ECHO_REQUEST << 8) + sum(struct.unpack(f"!{len(_PAYLOAD_PAD) // 2}H", _PAYLOAD_PAD))
+
+def build_echo(ident, seq):
+    total = _CONST_SUM + ident + seq
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, ~total & 0xFFFF, ident, seq) + PAYLOAD
+
+def open_icmp_socket():
+    for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            return socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP), kind
+        except OSError:
+            continue
+    return None, None
+
+def drain(sock):
+    """Yield every datagram already queued on a non-blocking socket."""
+    while True:
+        try:
+            yield sock.recvfrom(2048)
+        except (BlockingIOError, InterruptedError):
+            return
+
+def icmp_sweep(ips, timeout=1.0):
+    """Return the set of IPs that answered, or None if no ICMP socket is available."""
+    sock, kind = open_icmp_socket()
+    if sock is None:
+        return None
+    sock.setblocking(False)
     try:
-        res = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return res.returncode == 0
-    except Exception:
-        return False
+        # best-effort: room for replies that land between two reaps
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF)
+    except OSError:
+        pass
+    ident = os.getpid() & 0xFFFF
+    pending = {}
+    alive = set()
+
+    def reap():
+        for data, addr in drain(sock):
+            # raw sockets (and macOS SOCK_DGRAM ones) hand back the IPv4 header
+            # too; an echo reply itself always starts with type 0, never 0x4_
+            if data and data[0] >> 4 == 4:
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8:
+                continue
+            icmp_type, _, _, rid, rseq = struct.unpack("!BBHHH", data[:8])
+            # the kernel rewrites the id on SOCK_DGRAM sockets, so only check it on raw ones
+            if icmp_type != ICMP_ECHO_REPLY or (kind == socket.SOCK_RAW and rid != ident):
+                continue
+            if pending.get(rseq) == addr[0]:
+                alive.add(pending.pop(rseq))
+
+    try:
+        for seq, ip in enumerate(ips):
+            # host_range() caps a sweep at MAX_HOSTS, so seq never wraps
+            packet = build_echo(ident, seq)
+            try:
+                try:
+                    sock.sendto(packet, (ip, 0))
+                except BlockingIOError:
+                    # send buffer full: reap replies while waiting for room, then retry
+                    readable, _, _ = select.select([sock], [sock], [], timeout)
+                    if readable:
+                        reap()
+                    sock.sendto(packet, (ip, 0))
+                pending[seq] = ip
+            except OSError:
+                pass
+            if seq % REAP_EVERY == REAP_EVERY - 1:
+                reap()
+        deadline = time.monotonic() + timeout
+        reap()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([sock], [], [], remaining)
+            if not readable:
+                break
+            # reap every queued reply per wakeup instead of one select() per reply
+            reap()
+    finally:
+        sock.close()
+    return alive
+
+def fping_sweep(ips, timeout_ms=1000):
+    """One fping process for the whole range; None if fping is not installed."""
+    exe = shutil.which("fping")
+    if exe is None:
+        return None
+    try:
+        # -a: print alive hosts only, -q: no per-probe chatter
+        res = subprocess.run([exe, "-a", "-q", "-t", str(timeout_ms), *ips],
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    except OSError:
+        return None
+    # 0-2: probed (some hosts may be down or unknown); 3 = bad arguments,
+    # 4 = system call failure, e.g. no CAP_NET_RAW - nothing was probed
+    if res.returncode > 2:
+        return None
+    return {line.strip() for line in res.stdout.splitlines() if line.strip()}
+
+def ping_process_sweep(ips):
+    """Run the system ping for every host concurrently; None if ping is missing or never probed."""
+    exe = shutil.which(PING_CMD[0])
+    if exe is None:
+        return None
+    # an absolute executable plus close_fds=False lets CPython launch each child
+    # with posix_spawn() instead of fork()+exec() on Linux/macOS; Windows keeps
+    # the default, so the pings don't inherit each other's handles
+    cmd = [exe] + PING_CMD[1:]
+    alive = set()
+    probed = False
+    for i in range(0, len(ips), PING_BATCH):
+        # start the whole batch first, then wait: the pings overlap instead of queueing
+        procs = [(ip, subprocess.Popen(cmd + [ip], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=CLOSE_FDS))
+                 for ip in ips[i:i + PING_BATCH]]
+        for ip, proc in procs:
+            rc = proc.wait()
+            if rc == 0:
+                alive.add(ip)
+            probed = probed or rc in (0, PING_NO_REPLY)
+    # every ping errored out (no permission, unsupported option): let the TCP probe decide
+    return alive if probed else None
+
+async def tcp_ping(ip, sem, port=80, timeout=0.5):
+    async with sem:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+            writer.close()
+            return True
+        except ConnectionRefusedError:
+            # an RST came back, so something is there
+            return True
+        except Exception:
+            return False
+
+async def tcp_sweep_async(ips, workers=256):
+    sem = asyncio.Semaphore(workers)
+    results = await asyncio.gather(*(tcp_ping(ip, sem) for ip in ips))
+    return {ip for ip, ok in zip(ips, results) if ok}
+
+def host_range(base, start=1, end=50):
+    """Hosts start .. end (1-based; end=None means all) of a network.
+
+    base is a CIDR ("10.0.0.0/28") or the /24 prefix "192.168.1." / "192.168.1".
+    Raises ValueError for more than MAX_HOSTS hosts; split the range instead.
+    """
+    if "/" in base:
+        net = ipaddress.IPv4Network(base, strict=False)
+    else:
+        net = ipaddress.IPv4Network(f"{base.rstrip('.')}.0/24", strict=False)
+    # counted before anything is built, so a /8 is refused without a 16M-entry tuple
+    total = net.num_addresses - 2 if net.prefixlen < 31 else net.num_addresses
+    start = max(start, 1)
+    count = (total if end is None else min(end, total)) - start + 1
+    if count > MAX_HOSTS:
+        raise ValueError(f"{count} hosts; at most {MAX_HOSTS} per sweep, split the range")
+    return tuple(str(h) for h in itertools.islice(net.hosts(), start - 1, end))
 
 def sweep(base, start=1, end=50):
-    alive = []
-    for i in range(start, end+1):
-        ip = f"{base}{i}"
-        if is_reachable(ip):
-            alive.append(ip)
-            print(f"[UP] {ip}")
-        else:
-            print(f"[DOWN] {ip}")
+    ips = host_range(base, start, end)
+    up = icmp_sweep(ips)
+    if up is None:
+        up = fping_sweep(ips)
+    if up is None:
+        up = ping_process_sweep(ips)
+    if up is None:
+        up = asyncio.run(tcp_sweep_async(ips))
+    alive = [ip for ip in ips if ip in up]
+    # one write for the whole report instead of a print() per host
+    sys.stdout.write("".join(f"[UP] {ip}\n" if ip in up else f"[DOWN] {ip}\n" for ip in ips))
     return alive
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python ping_sweeper.py <base> [start] [end]")
+        print("Usage: python ping_sweeper.py <base|cidr> [start] [end]")
         sys.exit(1)
     base = sys.argv[1]
+    # a CIDR covers its whole network unless a range is given; a bare prefix keeps 1-50
+    default_end = None if "/" in base else 50
     try:
         start = int(sys.argv[2]) if len(sys.argv) >= 3 else 1
-        end = int(sys.argv[3]) if len(sys.argv) >= 4 else 50
+        end = int(sys.argv[3]) if len(sys.argv) >= 4 else default_end
     except Exception:
-        start, end = 1, 50
-    alive = sweep(base, start, end)
+        start, end = 1, default_end
+    try:
+        alive = sweep(base, start, end)
+    except ValueError as e:
+        print(f"Invalid base address {base!r}: {e}")
+        sys.exit(1)
     print("Alive hosts:", alive)
 
 if __name__ == "__main__":
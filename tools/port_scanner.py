@@ -1,46 +1,288 @@
 #!/usr/bin/env python3
+"""
+port_scanner.py - small TCP connect scanner (non-blocking, single thread)
+Usage:
+    python port_scanner.py <target> [ports] [--banners] [--first-hit]
+Example:
+    python port_scanner.py 192.168.1.1 22,80,443 --banners
+    python port_scanner.py 192.168.1.1 1-1024
+Stage 1 is a cheap connect probe over every port; with --banners, stage 2
+sends an HTTP HEAD to the open ports only and prints what comes back.
+--first-hit stops at the first open port (a cheap "is anything listening?").
+"""
+import os
+import sys
+import errno
+import time
+import socket
+import struct
+import asyncio
+import itertools
+import selectors
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+DEFAULT_PORTS = (21,22,23,25,53,80,110,139,143,443,445,3306,3389,8080)
+FINGERPRINT_WORKERS = 20
+BANNER_BYTES = 4096
+BANNER_RCVBUF = 65536
+# once the first bytes are in, wait only this long for the rest of the reply
+BANNER_TAIL_TIMEOUT = 0.5
+# HEAD request split around the Host value: building it is a plain bytes concat
+HEAD_PRE = b"HEAD / HTTP/1.1\r\nHost: "
+HEAD_POST = b"\r\nConnection: close\r\n\r\n"
+# connect_ex codes meaning "handshake still in progress" on a non-blocking socket
+CONNECTING = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN)
+# SO_LINGER on, 0 s: close() sends RST and frees the socket at once, so open
+# ports probed by wide scans don't pile up in TIME_WAIT (struct linger is two
+# u_shorts on Windows, two ints elsewhere)
+LINGER_RST = struct.pack("HH" if os.name == "nt" else "ii", 1, 0)
+# descriptors left free for stdio, the selector itself and the stage-2 sockets
+FD_HEADROOM = 32
+# socket() failing with these means "too many open fds right now", not "broken"
+FD_EXHAUSTED = (errno.EMFILE, errno.ENFILE)
+
+def _port_range(a, b):
+    lo, hi = int(a), int(b)
+    if not 0 <= lo <= 65535 or not 0 <= hi <= 65535:
+        raise ValueError(f"port range {lo}-{hi} is outside 0-65535")
+    return range(lo, hi + 1)
+
+def parse_ports(spec):
+    """'22,80,443' -> list; '1-1024' -> range, so wide scans never build a port list.
+
+    Raises ValueError for anything that isn't a port number in 0-65535.
     """
-    port_scanner.py - small TCP connect scanner
-    Usage:
-        python port_scanner.py <target> [ports]
-    Example:
-        python port_scanner.py 192.168.1.1 22,80,443
+    spec = spec.strip()
+    if "," not in spec and "-" in spec:
+        return _port_range(*spec.split("-", 1))
+    ports = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            ports.extend(_port_range(*part.split("-", 1)))
+        else:
+            port = int(part)
+            if not 0 <= port <= 65535:
+                raise ValueError(f"port {port} is outside 0-65535")
+            ports.append(port)
+    return ports
+
+def resolve(host):
+    """Resolve host to one IPv4 address up front, so per-port connects skip getaddrinfo."""
+    return socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_STREAM)[0][4][0]
+
+def connect_scan(target, ports, timeout=0.6, workers=1000, first_hit=False, ip=None):
+    """Stage 1: non-blocking connects multiplexed on one selector.
+
+    Up to `workers` connects are in flight at once, all watched by a single
+    epoll/kqueue/select object, so completions are dispatched in O(ready).
+    connect_ex + SO_ERROR means closed ports never raise. Returns the open
+    ports in input order. With first_hit, the scan stops at the first open
+    port and every pending connect is abandoned. ip, when given, is target
+    already resolved and skips the lookup.
     """
-    import sys
-    import socket
-
-    def scan(target, ports=None, timeout=0.6):
-        if ports is None:
-            ports = [21,22,23,25,53,80,110,139,143,443,445,3306,3389,8080]
-        open_ports = []
-        for p in ports:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(timeout)
+    if ip is None:
+        try:
+            ip = resolve(target)
+        except OSError:
+            return []
+    if os.name == "nt":
+        # select() on Windows handles at most 512 sockets
+        workers = min(workers, 500)
+    elif resource is not None:
+        # every in-flight connect holds an fd; stay under the soft RLIMIT_NOFILE
+        # (256 by default on macOS)
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            workers = max(1, min(workers, soft - FD_HEADROOM))
+    sel = selectors.DefaultSelector()
+    todo = iter(ports)
+    # insertion-ordered, and every entry gets the same timeout, so the first
+    # entry always holds the earliest deadline
+    inflight = {}
+    found = set()
+
+    def done():
+        return first_hit and bool(found)
+
+    def launch():
+        nonlocal todo
+        while len(inflight) < workers and not done():
+            port = next(todo, None)
+            if port is None:
+                return
             try:
-                s.connect((target, p))
-                open_ports.append(p)
-            except Exception:
-                pass
-            finally:
+                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            except OSError as e:
+                if e.errno not in FD_EXHAUSTED or not inflight:
+                    raise
+                # out of fds (someone else holds some too): put the port back
+                # and launch it once in-flight connects have finished
+                todo = itertools.chain((port,), todo)
+                return
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, LINGER_RST)
+            s.setblocking(False)
+            try:
+                err = s.connect_ex((ip, port))
+            except (OSError, OverflowError):
+                # OverflowError: port outside 0-65535 from a caller that skipped parse_ports
+                err = None
+            if err in CONNECTING:
+                inflight[s] = (port, time.monotonic() + timeout)
+                sel.register(s, selectors.EVENT_WRITE, port)
+                continue
+            if err == 0:
+                found.add(port)
+            s.close()
+
+    def drop(s):
+        sel.unregister(s)
+        s.close()
+        del inflight[s]
+
+    try:
+        launch()
+        while inflight and not done():
+            first_deadline = next(iter(inflight.values()))[1]
+            for key, _ in sel.select(max(0, first_deadline - time.monotonic())):
+                s = key.fileobj
+                if s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                    found.add(key.data)
+                drop(s)
+            now = time.monotonic()
+            for s, (_, deadline) in list(inflight.items()):
+                if deadline > now:
+                    break
+                drop(s)
+            launch()
+    finally:
+        for s in inflight:
+            s.close()
+        sel.close()
+    return [p for p in ports if p in found]
+
+def banner_socket(family=socket.AF_INET):
+    s = socket.socket(family, socket.SOCK_STREAM)
+    # no Nagle delay on the small HEAD write; room for the whole reply in one recv
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BANNER_RCVBUF)
+    s.setblocking(False)
+    return s
+
+async def fingerprint(host, port, sem, timeout=3, addr=None, limit=BANNER_BYTES):
+    """Send an HTTP HEAD to an open port and return up to `limit` bytes of reply.
+
+    A connect that times out returns "ERROR: timed out"; a service that
+    accepts but stays silent returns "".
+
+    addr, when given, is the already-resolved IPv4 address to connect to;
+    otherwise host is resolved here (IPv4 or IPv6). host is always what goes
+    in the Host header.
+    """
+    async with sem:
+        loop = asyncio.get_running_loop()
+        sock = None
+        try:
+            if addr is None:
+                try:
+                    infos = await asyncio.wait_for(loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout)
+                except asyncio.TimeoutError:
+                    return "ERROR: timed out"
+                targets = [(info[0], info[4]) for info in infos]
+            else:
+                targets = [(socket.AF_INET, (addr, port))]
+            # try every address in resolver order (e.g. ::1 then 127.0.0.1); first connect wins
+            error = None
+            for family, sockaddr in targets:
+                sock = banner_socket(family)
                 try:
-                    s.close()
-                except Exception:
-                    pass
-        return open_ports
-
-    def main():
-        if len(sys.argv) < 2:
-            print("Usage: python port_scanner.py <target> [comma-separated-ports]")
+                    await asyncio.wait_for(loop.sock_connect(sock, sockaddr), timeout)
+                    break
+                except (OSError, asyncio.TimeoutError) as e:
+                    sock.close()
+                    sock = None
+                    error = e
+            if sock is None:
+                if error is None or isinstance(error, asyncio.TimeoutError):
+                    return "ERROR: timed out"
+                return f"ERROR: {error}"
+            # an IPv6 literal goes in the Host header bracketed, as in a URL
+            host_hdr = f"[{host}]" if ":" in host else host
+            await loop.sock_sendall(sock, HEAD_PRE + host_hdr.encode() + HEAD_POST)
+            # the reply is read straight into one buffer: no stream objects, no per-read bytes
+            buf = bytearray(limit)
+            view = memoryview(buf)
+            got = await asyncio.wait_for(loop.sock_recv_into(sock, view), timeout)
+            n = got
+            # one read may return a partial reply; keep going until EOF or the cap
+            while n and got < limit:
+                try:
+                    n = await asyncio.wait_for(loop.sock_recv_into(sock, view[got:]), BANNER_TAIL_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                got += n
+            return buf[:got].decode(errors="ignore")
+        except asyncio.TimeoutError:
+            return ""
+        except Exception as e:
+            return f"ERROR: {e}"
+        finally:
+            if sock is not None:
+                sock.close()
+
+async def fingerprint_all(target, ports, ip):
+    # stage 2: the expensive HEAD round-trip only runs on the few hits
+    sem = asyncio.Semaphore(FINGERPRINT_WORKERS)
+    return await asyncio.gather(*(fingerprint(target, p, sem, addr=ip) for p in ports))
+
+def scan(target, ports=None, timeout=0.6, workers=1000, first_hit=False, ip=None):
+    if ports is None:
+        ports = DEFAULT_PORTS
+    return connect_scan(target, ports, timeout, workers, first_hit, ip)
+
+def scan_banners(target, ports=None, timeout=0.6, workers=1000, first_hit=False):
+    """Like scan(), but returns {open_port: banner}."""
+    # one lookup shared by both stages
+    try:
+        ip = resolve(target)
+    except OSError:
+        return {}
+    open_ports = scan(target, ports, timeout, workers, first_hit, ip)
+    if not open_ports:
+        return {}
+    return dict(zip(open_ports, asyncio.run(fingerprint_all(target, open_ports, ip))))
+
+def main():
+    flags = {a for a in sys.argv[1:] if a.startswith("--")}
+    argv = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not argv:
+        print("Usage: python port_scanner.py <target> [ports: 22,80,443 or 1-1024] [--banners] [--first-hit]")
+        sys.exit(1)
+    first_hit = "--first-hit" in flags
+    target = argv[0]
+    ports = None
+    if len(argv) >= 2:
+        try:
+            ports = parse_ports(argv[1])
+        except ValueError as e:
+            print(f"Invalid port list {argv[1]!r}: {e}")
             sys.exit(1)
-        target = sys.argv[1]
-        ports = None
-        if len(sys.argv) >= 3:
-            try:
-                ports = [int(x.strip()) for x in sys.argv[2].split(",") if x.strip()]
-            except Exception:
-                ports = None
-        open_ports = scan(target, ports)
+    if "--banners" not in flags:
+        open_ports = scan(target, ports, first_hit=first_hit)
         print(f"Open ports on {target}: {open_ports}")
+        return
+    banners = scan_banners(target, ports, first_hit=first_hit)
+    lines = [f"Open ports on {target}: {list(banners)}\n"]
+    for p, banner in banners.items():
+        first = banner.splitlines()[0] if banner else ""
+        lines.append(f"  {p}: {first}\n")
+    sys.stdout.write("".join(lines))
 
-    if __name__ == "__main__":
-        main()
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,124 @@
 #!/usr/bin/env python3
+"""
+subdomain_finder.py - small dictionary-based subdomain probe (educational)
+Usage:
+    python subdomain_finder.py example.com
+Uses aiohttp (pooled keep-alive connections, concurrent HEAD probes) when
+installed; falls back to a threaded requests.Session otherwise. Names are
+resolved first (aiodns if installed, else the event loop's getaddrinfo) so
+non-existent subdomains cost one DNS round-trip instead of an HTTP timeout;
+survivors are then probed by IP with a Host header, so no name is looked up twice.
+"""
+import sys
+import socket
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import aiohttp
+except Exception:
+    aiohttp = None
+try:
+    import aiodns
+except Exception:
+    aiodns = None
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except Exception:
+    requests = None
+
+COMMON_SUBS = ["www","mail","ftp","dev","test","staging","api","beta"]
+POOL_SIZE = 32
+
+def make_session():
+    # one keep-alive pool sized for the worker threads; no urllib3 retries
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+HTTP = make_session() if requests is not None else None
+
+def make_resolver():
+    """aiodns resolver, or None to use the loop's getaddrinfo.
+
+    aiodns needs a selector loop; on Windows asyncio.run() gives a Proactor
+    loop and DNSResolver() raises RuntimeError, so it is skipped there.
     """
-    subdomain_finder.py - small dictionary-based subdomain probe (educational)
-    Usage:
-        python subdomain_finder.py example.com
-    """
-    import sys
+    if aiodns is None or sys.platform == "win32":
+        return None
     try:
-        import requests
-    except Exception:
-        requests = None
-
-    COMMON_SUBS = ["www","mail","ftp","dev","test","staging","api","beta"]
-
-    def probe(domain, subs=None, timeout=2):
-        if requests is None:
-            print("requests not installed. Install via: pip install requests")
-            return []
-        subs = subs or COMMON_SUBS
-        found = []
-        for s in subs:
-            url = f"http://{s}.{domain}"
-            try:
-                r = requests.get(url, timeout=timeout, allow_redirects=True)
-                if r.status_code < 400:
-                    found.append((url, r.status_code))
-            except Exception:
-                pass
-        return found
-
-    def main():
-        if len(sys.argv) < 2:
-            print("Usage: python subdomain_finder.py <domain>")
-            sys.exit(1)
-        domain = sys.argv[1]
-        found = probe(domain)
-        for url, code in found:
-            print(f"[FOUND] {url} -> {code}")
-        if not found:
-            print("No subdomains found (with default list).")
-
-    if __name__ == "__main__":
-        main()
+        return aiodns.DNSResolver()
+    except RuntimeError:
+        return None
+
+def _node_ip(result):
+    ip = result.nodes[0].addr[0]
+    return ip.decode() if isinstance(ip, bytes) else ip
+
+async def resolve_async(names):
+    """Return {name: ipv4} for the names that resolve."""
+    resolver = make_resolver()
+    if resolver is not None:
+        results = await asyncio.gather(*(resolver.getaddrinfo(n, family=socket.AF_INET) for n in names),
+                                       return_exceptions=True)
+        return {n: _node_ip(r) for n, r in zip(names, results)
+                if not isinstance(r, Exception) and r.nodes}
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(loop.getaddrinfo(n, None, family=socket.AF_INET) for n in names),
+                                   return_exceptions=True)
+    return {n: r[0][4][0] for n, r in zip(names, results) if not isinstance(r, Exception) and r}
+
+async def probe_async(domain, subs=None, timeout=2):
+    subs = subs or COMMON_SUBS
+    resolved = await resolve_async([f"{s}.{domain}" for s in subs])
+    if not resolved:
+        return []
+    connector = aiohttp.TCPConnector(limit=100)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        async def head(host, ip):
+            # connect to the address we already have; the Host header picks the vhost
+            # HEAD: the status code is all we need, skip the body bytes
+            # a redirect already proves the name is served; don't chase it
+            async with session.head(f"http://{ip}", headers={"Host": host}, allow_redirects=False) as r:
+                return r.status
+        hosts = [f"{s}.{domain}" for s in subs if f"{s}.{domain}" in resolved]
+        codes = await asyncio.gather(*(head(h, resolved[h]) for h in hosts), return_exceptions=True)
+    return [(f"http://{h}", code) for h, code in zip(hosts, codes) if isinstance(code, int) and code < 400]
+
+def probe(domain, subs=None, timeout=2):
+    if aiohttp is not None:
+        return asyncio.run(probe_async(domain, subs, timeout))
+    if requests is None:
+        print("requests not installed. Install via: pip install requests")
+        return []
+    subs = subs or COMMON_SUBS
+    hosts = [f"{s}.{domain}" for s in subs]
+
+    def check(host):
+        try:
+            # a failed lookup skips the whole HTTP round-trip; a good one is reused
+            ip = socket.gethostbyname(host)
+            return HTTP.head(f"http://{ip}", headers={"Host": host}, timeout=timeout, allow_redirects=False).status_code
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(len(hosts), POOL_SIZE)) as ex:
+        codes = list(ex.map(check, hosts))
+    return [(f"http://{h}", code) for h, code in zip(hosts, codes) if code is not None and code < 400]
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python subdomain_finder.py <domain>")
+        sys.exit(1)
+    domain = sys.argv[1]
+    found = probe(domain)
+    for url, code in found:
+        print(f"[FOUND] {url} -> {code}")
+    if not found:
+        print("No subdomains found (with default list).")
+
+if __name__ == "__main__":
+    main()